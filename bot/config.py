@@ -43,6 +43,9 @@ class Config:
     pushover_user_key: str | None = field(
         default_factory=lambda: os.getenv("PUSHOVER_USER_KEY") or None
     )
+    pushover_concurrency: int = field(
+        default_factory=lambda: int(os.getenv("PUSHOVER_CONCURRENCY", "10"))
+    )
 
     # Redis
     redis_host: str = field(default_factory=lambda: os.getenv("REDIS_HOST", "redis"))
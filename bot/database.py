@@ -8,6 +8,18 @@ users (
     pushover_key         TEXT    NOT NULL,
     last_notification_at REAL    DEFAULT NULL    -- Unix timestamp of last Pushover alert
 )
+
+Connection
+----------
+A single long-lived connection is opened by ``init_db()`` (WAL journal,
+``synchronous=NORMAL``) and shared by every helper; ``close_db()`` closes it
+on shutdown.
+
+Caching
+-------
+``get_all_users()`` is called on every sell trade, so its result is cached
+in-process.  ``upsert_user()`` / ``delete_user()`` invalidate the cache and
+the ``last_notification_at`` writers patch the cached rows in place.
 """
 
 from __future__ import annotations
@@ -25,84 +37,174 @@ logger = logging.getLogger(__name__)
 
 _DB_PATH = settings.database_path
 
+_db: aiosqlite.Connection | None = None
+
+# Cached result of get_all_users(); None means "reload on next call"
+_users_cache: list[dict] | None = None
+
+# SQL kept as constants for readability; _USER_COLUMNS is written once so
+# every query returns the tuple order _row_to_user() expects.
+_USER_COLUMNS = "user_id, pushover_key, last_notification_at"
+_SELECT_ALL_USERS_SQL = f"SELECT {_USER_COLUMNS} FROM users"
+_SELECT_USER_SQL = f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ?"
+_CLEAR_LAST_NOTIFICATION_SQL = "UPDATE users SET last_notification_at = NULL WHERE user_id = ?"
+_CLAIM_ELIGIBLE_SQL = f"""
+    UPDATE users SET last_notification_at = ?
+    WHERE last_notification_at IS NULL OR last_notification_at <= ?
+    RETURNING {_USER_COLUMNS}
+"""
+
 
 async def init_db() -> None:
-    """Create tables if they do not exist yet."""
+    """Open the shared connection and create tables if they do not exist yet."""
+    global _db
     os.makedirs(os.path.dirname(_DB_PATH), exist_ok=True)
-    async with aiosqlite.connect(_DB_PATH) as db:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id              INTEGER PRIMARY KEY,
-                pushover_key         TEXT NOT NULL,
-                last_notification_at REAL DEFAULT NULL
-            )
-            """
+    _db = await aiosqlite.connect(_DB_PATH)
+    # Plain tuples – rows are turned into dicts by _row_to_user()
+    _db.row_factory = None
+    await _db.execute("PRAGMA journal_mode=WAL")
+    await _db.execute("PRAGMA synchronous=NORMAL")
+    await _db.execute("PRAGMA temp_store=MEMORY")
+    await _db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id              INTEGER PRIMARY KEY,
+            pushover_key         TEXT NOT NULL,
+            last_notification_at REAL DEFAULT NULL
         )
-        await db.commit()
+        """
+    )
+    await _db.commit()
     logger.info("Database initialised at %s", _DB_PATH)
 
 
+async def close_db() -> None:
+    global _db
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+
+def _get_db() -> aiosqlite.Connection:
+    if _db is None:
+        raise RuntimeError("Database not initialised – call init_db() first")
+    return _db
+
+
+def _row_to_user(row: tuple) -> dict:
+    return {
+        "user_id": row[0],
+        "pushover_key": row[1],
+        "last_notification_at": row[2],
+    }
+
+
+def _invalidate_users_cache() -> None:
+    global _users_cache
+    _users_cache = None
+
+
+def _patch_users_cache(user_ids: set[int], last_notification_at: float | None) -> None:
+    """Update cached rows in place instead of busting the whole cache."""
+    if _users_cache is None:
+        return
+    for user in _users_cache:
+        if user["user_id"] in user_ids:
+            user["last_notification_at"] = last_notification_at
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # CRUD helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
 async def upsert_user(user_id: int, pushover_key: str) -> None:
     """Insert or update a user's Pushover key."""
-    async with aiosqlite.connect(_DB_PATH) as db:
-        await db.execute(
-            """
-            INSERT INTO users (user_id, pushover_key)
-            VALUES (?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET pushover_key = excluded.pushover_key
-            """,
-            (user_id, pushover_key),
-        )
-        await db.commit()
+    db = _get_db()
+    await db.execute(
+        """
+        INSERT INTO users (user_id, pushover_key)
+        VALUES (?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET pushover_key = excluded.pushover_key
+        """,
+        (user_id, pushover_key),
+    )
+    await db.commit()
+    _invalidate_users_cache()
     logger.debug("Upserted user %d", user_id)
 
 
 async def delete_user(user_id: int) -> bool:
     """Remove a user. Returns True if a row was deleted."""
-    async with aiosqlite.connect(_DB_PATH) as db:
-        cursor = await db.execute(
-            "DELETE FROM users WHERE user_id = ?", (user_id,)
-        )
-        await db.commit()
-        deleted = cursor.rowcount > 0
+    db = _get_db()
+    cursor = await db.execute(
+        "DELETE FROM users WHERE user_id = ?", (user_id,)
+    )
+    await db.commit()
+    deleted = cursor.rowcount > 0
     if deleted:
+        _invalidate_users_cache()
         logger.debug("Deleted user %d", user_id)
     return deleted
 
 
 async def get_all_users() -> list[dict]:
-    """Return all subscribed users."""
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            "SELECT user_id, pushover_key, last_notification_at FROM users"
-        ) as cursor:
-            rows = await cursor.fetchall()
-    return [dict(row) for row in rows]
-
-
-async def update_last_notification(user_id: int) -> None:
-    """Stamp the current time as last_notification_at for the user."""
-    async with aiosqlite.connect(_DB_PATH) as db:
-        await db.execute(
-            "UPDATE users SET last_notification_at = ? WHERE user_id = ?",
-            (time.time(), user_id),
-        )
-        await db.commit()
+    """
+    Return all subscribed users.
+
+    The returned list is the shared cache – treat it as read-only.
+    """
+    global _users_cache
+    if _users_cache is not None:
+        return _users_cache
+
+    db = _get_db()
+    async with db.execute(_SELECT_ALL_USERS_SQL) as cursor:
+        rows = await cursor.fetchall()
+    _users_cache = [_row_to_user(row) for row in rows]
+    return _users_cache
+
+
+async def clear_last_notifications(user_ids: list[int]) -> None:
+    """
+    Reset last_notification_at to NULL for several users – used to release a
+    claim made by ``claim_eligible_users()`` when the send failed.
+    """
+    if not user_ids:
+        return
+
+    # Fixed SQL text (unlike an IN-list sized to the batch) so every batch
+    # size reuses the same prepared statement; one thread hop for all rows.
+    db = _get_db()
+    await db.executemany(_CLEAR_LAST_NOTIFICATION_SQL, ((uid,) for uid in user_ids))
+    await db.commit()
+    _patch_users_cache(set(user_ids), None)
+
+
+async def claim_eligible_users(cooldown_seconds: float) -> list[dict]:
+    """
+    Atomically stamp and return every user whose cooldown has passed.
+
+    A single ``UPDATE … RETURNING`` both selects the eligible users and
+    records the notification time, so concurrent callers can never claim
+    the same user twice.  Release failed sends with
+    ``clear_last_notifications()``.
+    """
+    now = time.time()
+    db = _get_db()
+    # fetchall() drains the RETURNING rows in one executor hop, keeping the
+    # awaits between the UPDATE and its commit to a minimum.
+    async with db.execute(_CLAIM_ELIGIBLE_SQL, (now, now - cooldown_seconds)) as cursor:
+        rows = await cursor.fetchall()
+    await db.commit()
+
+    claimed = [_row_to_user(row) for row in rows]
+    _patch_users_cache({u["user_id"] for u in claimed}, now)
+    return claimed
 
 
 async def get_user(user_id: int) -> Optional[dict]:
     """Fetch a single user row or None."""
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            "SELECT user_id, pushover_key, last_notification_at FROM users WHERE user_id = ?",
-            (user_id,),
-        ) as cursor:
-            row = await cursor.fetchone()
-    return dict(row) if row else None
+    db = _get_db()
+    async with db.execute(_SELECT_USER_SQL, (user_id,)) as cursor:
+        row = await cursor.fetchone()
+    return _row_to_user(row) if row else None
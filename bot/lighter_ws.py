@@ -35,7 +35,7 @@ Ping/pong
 
 Reconnection
 ------------
-  • Exponential back-off on errors.
+  • Exponential back-off with jitter on errors.
   • The server silently drops every connection after 24 hours.  We force a
     clean reconnect after MAX_CONNECTION_AGE (23.5 h) so we never miss the
     server-side cut-off.
@@ -46,13 +46,17 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import random
 import time
 from typing import Awaitable, Callable
 
+import orjson
 import websockets
+from websockets.exceptions import ConnectionClosedOK
 
 from bot.config import settings
-from bot.redis_client import purge_old_trades, store_trades
+from bot.models import EnrichedTrade
+from bot.redis_client import store_and_purge
 
 logger = logging.getLogger(__name__)
 
@@ -61,23 +65,23 @@ _MIN_BACKOFF: float = 2.0    # seconds
 _MAX_BACKOFF: float = 60.0   # seconds
 _BACKOFF_FACTOR: float = 2.0
 
+
 # Lighter drops every WS connection after 24 h – reconnect slightly before that
 MAX_CONNECTION_AGE: float = 23.5 * 3600   # seconds
 
+# Server pings have a fixed shape; matching the prefix lets us answer them
+# without a JSON parse.  Both the compact and the spaced form are accepted.
+_PING_PREFIXES: tuple[str, ...] = ('{"type":"ping"', '{"type": "ping"')
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Side helpers  (operate on the enriched trade dict stored in Redis)
-# ─────────────────────────────────────────────────────────────────────────────
-
-def is_sell(trade: dict) -> bool:
-    """Return True when the tracked account is on the ASK (sell) side."""
-    return trade.get("_side") == "sell"
+# Values of ``EnrichedTrade.side`` set during enrichment
+_SIDE_BUY = "buy"
+_SIDE_SELL = "sell"
+_SIDE_UNKNOWN = "unknown"
 
 
-def is_buy(trade: dict) -> bool:
-    """Return True when the tracked account is on the BID (buy) side."""
-    return trade.get("_side") == "buy"
-
+# ─────────────────────────────────────────────────────────────────────────────
+# Side helpers
+# ─────────────────────────────────────────────────────────────────────────────
 
 def _resolve_side(trade: dict, account_id_int: int) -> str:
     """
@@ -87,10 +91,22 @@ def _resolve_side(trade: dict, account_id_int: int) -> str:
     an explicit ``side`` field.
     """
     if trade.get("bid_account_id") == account_id_int:
-        return "buy"
+        return _SIDE_BUY
     if trade.get("ask_account_id") == account_id_int:
-        return "sell"
-    return "unknown"
+        return _SIDE_SELL
+    return _SIDE_UNKNOWN
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Back-off helper
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _jittered(backoff: float) -> float:
+    """
+    Return a delay in [backoff/2, backoff] so reconnecting clients do not
+    retry in lock-step after a server-side outage.
+    """
+    return backoff / 2 + random.uniform(0, backoff / 2)
 
 
 class LighterWebSocketClient:
@@ -100,15 +116,28 @@ class LighterWebSocketClient:
     Parameters
     ----------
     on_sell_callback:
-        Async callable invoked for *each individual sell trade* as it arrives.
-        Signature: ``async def cb(trade: dict) -> None``
+        Async callable invoked once per incoming message with *all new sell
+        trades* it contained (never with an empty list).
+        Signature: ``async def cb(trades: list[EnrichedTrade]) -> None``
     """
 
     def __init__(
         self,
-        on_sell_callback: Callable[[dict], Awaitable[None]],
+        on_sell_callback: Callable[[list[EnrichedTrade]], Awaitable[None]],
     ) -> None:
         self._on_sell = on_sell_callback
+        # Converted once here rather than on every trade batch
+        self._account_id_str = settings.lighter_account_id
+        self._account_id_int = int(self._account_id_str)
+        # Outgoing frames never change for the lifetime of the client
+        self._subscribe_frame = json.dumps(
+            {
+                "type": "subscribe",
+                "channel": f"account_all_trades/{self._account_id_str}",
+                "auth": settings.lighter_auth_token,
+            }
+        )
+        self._pong_frame = json.dumps({"type": "pong"})
         self._running = False
         self._task: asyncio.Task | None = None
 
@@ -142,14 +171,15 @@ class LighterWebSocketClient:
             except asyncio.CancelledError:
                 break
             except Exception as exc:
+                delay = _jittered(backoff)
                 logger.warning(
-                    "WebSocket error: %s – reconnecting in %.1fs", exc, backoff
+                    "WebSocket error: %s – reconnecting in %.1fs", exc, delay
                 )
-                await asyncio.sleep(backoff)
+                await asyncio.sleep(delay)
                 backoff = min(backoff * _BACKOFF_FACTOR, _MAX_BACKOFF)
 
     async def _connect_and_listen(self) -> None:
-        account_id = settings.lighter_account_id
+        account_id = self._account_id_str
         logger.info("Connecting to Lighter WebSocket %s", settings.lighter_ws_url)
 
         async with websockets.connect(
@@ -158,19 +188,14 @@ class LighterWebSocketClient:
             # application-level {"type": "ping"} / {"type": "pong"} messages.
             ping_interval=None,
             close_timeout=10,
+            # Skip permessage-deflate negotiation – trade frames are small and
+            # decompression would cost CPU on every message.
+            compression=None,
         ) as ws:
             logger.info(
                 "Connected. Subscribing to account_all_trades/%s", account_id
             )
-            await ws.send(
-                json.dumps(
-                    {
-                        "type": "subscribe",
-                        "channel": f"account_all_trades/{account_id}",
-                        "auth": settings.lighter_auth_token,
-                    }
-                )
-            )
+            await ws.send(self._subscribe_frame)
 
             # Run the receive loop until MAX_CONNECTION_AGE, then return so
             # _run() can open a fresh connection.
@@ -187,26 +212,34 @@ class LighterWebSocketClient:
 
     async def _receive_loop(self, ws) -> None:
         """Consume messages until the connection closes or we are stopped."""
-        async for raw_msg in ws:
-            if not self._running:
-                break
+        while self._running:
+            try:
+                raw_msg = await ws.recv()
+            except ConnectionClosedOK:
+                return
             try:
                 await self._handle_message(ws, raw_msg)
             except Exception as exc:
                 logger.exception("Error handling WS message: %s", exc)
 
     async def _handle_message(self, ws, raw: str) -> None:
+        # ── Fast path: application-level ping ─────────────────────────────────
+        if isinstance(raw, str) and raw.startswith(_PING_PREFIXES):
+            await ws.send(self._pong_frame)
+            logger.debug("Replied to server ping with pong")
+            return
+
         try:
-            msg = json.loads(raw)
-        except json.JSONDecodeError:
+            msg = orjson.loads(raw)
+        except orjson.JSONDecodeError:
             logger.warning("Received non-JSON message: %.200s", raw)
             return
 
         msg_type = msg.get("type", "")
 
-        # ── Application-level ping/pong ───────────────────────────────────────
+        # ── Application-level ping/pong (other encodings) ─────────────────────
         if msg_type == "ping":
-            await ws.send(json.dumps({"type": "pong"}))
+            await ws.send(self._pong_frame)
             logger.debug("Replied to server ping with pong")
             return
 
@@ -215,12 +248,12 @@ class LighterWebSocketClient:
             logger.debug("Ignoring message type: %s", msg_type)
             return
 
-        account_id_str = settings.lighter_account_id
-        account_id_int = int(account_id_str)
+        account_id_str = self._account_id_str
+        account_id_int = self._account_id_int
         trades_by_market: dict[str, list[dict]] = msg.get("trades") or {}
 
-        all_trades: list[dict] = []
-        sell_trades: list[dict] = []
+        all_trades: list[EnrichedTrade] = []
+        sell_trades: list[EnrichedTrade] = []
         now = time.time()
 
         for _market_key, trade_list in trades_by_market.items():
@@ -231,34 +264,36 @@ class LighterWebSocketClient:
                 ts_ms = trade.get("timestamp")
                 ts_sec = (ts_ms / 1000.0) if ts_ms else now
 
-                enriched = {
-                    **trade,
-                    # Normalised helpers used by scheduler / pushover
-                    "_side": side,
-                    "_ts": ts_sec,          # seconds (Redis score)
-                    "_usd": float(trade.get("usd_amount") or 0),
-                    "_market": str(trade.get("market_id", _market_key)),
-                    "_account_id": account_id_str,
-                    "_received_at": now,
-                }
+                enriched = EnrichedTrade(
+                    trade_id=trade.get("trade_id"),
+                    market=str(trade.get("market_id", _market_key)),
+                    price=trade.get("price", "?"),
+                    size=trade.get("size", "?"),
+                    usd=float(trade.get("usd_amount") or 0),
+                    side=side,
+                    ts=ts_sec,
+                    account_id=account_id_str,
+                    bid_account_id=trade.get("bid_account_id"),
+                    ask_account_id=trade.get("ask_account_id"),
+                    received_at=now,
+                )
                 all_trades.append(enriched)
-                if side == "sell":
+                if side == _SIDE_SELL:
                     sell_trades.append(enriched)
 
-        # Persist all trades
+        # Persist all trades; sells already dispatched earlier are dropped
         if all_trades:
-            await store_trades(account_id_str, all_trades)
-            await purge_old_trades(account_id_str)
+            sell_trades = await store_and_purge(account_id_str, all_trades, sell_trades)
             logger.debug(
-                "Processed %d trades (%d sells) for account %s",
+                "Processed %d trades (%d new sells) for account %s",
                 len(all_trades),
                 len(sell_trades),
                 account_id_str,
             )
 
-        # Fire sell callback immediately
-        for sell_trade in sell_trades:
+        # Fire sell callback immediately, once for the whole batch
+        if sell_trades:
             try:
-                await self._on_sell(sell_trade)
+                await self._on_sell(sell_trades)
             except Exception as exc:
                 logger.exception("on_sell_callback raised: %s", exc)
@@ -4,12 +4,14 @@ main.py – entry point.
 Start-up sequence
 -----------------
 1. Configure logging.
-2. Initialise SQLite schema.
+2. Initialise SQLite schema, the Redis connection pool and the Pushover
+   HTTP client.
 3. Build Telegram Application.
 4. Start the APScheduler (5-min report job).
-5. Start the Lighter WebSocket client (background task).
-6. Run the Telegram bot (polling – blocks until SIGINT/SIGTERM).
-7. Graceful shutdown.
+5. Start the sell-alert worker (background task).
+6. Start the Lighter WebSocket client (background task).
+7. Run the Telegram bot (polling – blocks until SIGINT/SIGTERM).
+8. Graceful shutdown.
 """
 
 from __future__ import annotations
@@ -20,12 +22,7 @@ import signal
 import sys
 
 from bot.config import settings
-from bot.database import init_db
-from bot.lighter_ws import LighterWebSocketClient
-from bot.pushover import notify_sell
-from bot.redis_client import close_redis
-from bot.scheduler import send_sell_telegram, set_bot, start_scheduler, stop_scheduler
-from bot.telegram_bot import build_application
+from bot.models import EnrichedTrade
 
 
 def _configure_logging() -> None:
@@ -42,12 +39,30 @@ def _configure_logging() -> None:
 
 
 async def main() -> None:
+    # Service modules pull in python-telegram-bot, APScheduler, websockets,
+    # httpx, redis and aiosqlite – import them here so that `import bot.main`
+    # stays cheap for tooling and health checks.
+    from bot.database import close_db, init_db
+    from bot.lighter_ws import LighterWebSocketClient
+    from bot.notifier import SellAlertWorker
+    from bot.pushover import close_pushover, init_pushover, notify_sell
+    from bot.redis_client import close_redis, enqueue_sell_alert, init_redis
+    from bot.scheduler import (
+        send_sell_telegram,
+        set_bot,
+        start_scheduler,
+        stop_scheduler,
+    )
+    from bot.telegram_bot import build_application
+
     _configure_logging()
     logger = logging.getLogger(__name__)
     logger.info("Starting Lighter Whale Tracker …")
 
     # ── Database ──────────────────────────────────────────────────────────────
     await init_db()
+    await init_redis()
+    await init_pushover()
 
     # ── Telegram bot ──────────────────────────────────────────────────────────
     app = build_application()
@@ -60,10 +75,18 @@ async def main() -> None:
     # ── Scheduler ─────────────────────────────────────────────────────────────
     start_scheduler()
 
+    # ── Sell-alert worker ─────────────────────────────────────────────────────
+    async def _deliver_sell(trades: list[EnrichedTrade]) -> None:
+        await notify_sell(trades)
+        await send_sell_telegram(trades)
+
+    alert_worker = SellAlertWorker(handler=_deliver_sell)
+    _alert_task = alert_worker.start()
+
     # ── Lighter WebSocket ─────────────────────────────────────────────────────
-    async def _on_sell(trade: dict) -> None:
-        await notify_sell(trade)
-        await send_sell_telegram(trade)
+    # The receive loop only enqueues; delivery happens in the worker above.
+    async def _on_sell(trades: list[EnrichedTrade]) -> None:
+        await enqueue_sell_alert(settings.lighter_account_id, trades)
 
     ws_client = LighterWebSocketClient(on_sell_callback=_on_sell)
     _ws_task = ws_client.start()
@@ -94,15 +117,27 @@ async def main() -> None:
     logger.info("Shutting down …")
     stop_scheduler()
     await ws_client.stop()
+    await alert_worker.stop()
     await app.updater.stop()
     await app.stop()
     await app.shutdown()
+    await close_pushover()
     await close_redis()
+    await close_db()
     logger.info("Shutdown complete.")
 
 
 if __name__ == "__main__":
+    # libuv-backed event loop on Linux/macOS; uvloop has no Windows build, so
+    # local development there falls back to the default asyncio loop.
+    try:
+        import uvloop
+    except ImportError:
+        _run = asyncio.run
+    else:
+        _run = uvloop.run
+
     try:
-        asyncio.run(main())
+        _run(main())
     except KeyboardInterrupt:
         pass
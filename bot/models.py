@@ -0,0 +1,28 @@
+"""
+models.py – lightweight value types shared between modules.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class EnrichedTrade:
+    """
+    A trade from the Lighter feed plus the normalised helpers used by the
+    scheduler and Pushover.  Built by lighter_ws.py for every incoming trade.
+    """
+
+    trade_id: int | None
+    market: str
+    price: str
+    size: str
+    usd: float
+    side: str              # "buy" | "sell" | "unknown"
+    ts: float              # Unix seconds (Redis score)
+    account_id: str
+    bid_account_id: int | None
+    ask_account_id: int | None
+    received_at: float
+
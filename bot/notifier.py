@@ -0,0 +1,122 @@
+"""
+notifier.py – background worker that drains the sell-alert queue.
+
+lighter_ws.py only enqueues new sells (``redis_client.enqueue_sell_alert``),
+so the WebSocket receive loop never waits on Pushover / Telegram latency,
+rate limiting or retries.  This worker pops batches in FIFO order
+(``BRPOP sell_alerts:{account_id}``) and hands each one to the handler.
+
+Delivery is at-most-once: a batch popped right before a crash is not
+re-delivered.  The queue survives restarts (Redis runs with AOF), so a
+backlog left at shutdown is picked up on the next start; batches older than
+_MAX_ALERT_AGE are dropped there instead of being sent late.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from bot.config import settings
+from bot.models import EnrichedTrade
+from bot.redis_client import pop_sell_alert
+
+logger = logging.getLogger(__name__)
+
+# How long a single BRPOP blocks before re-checking the running flag
+_POP_TIMEOUT: float = 5.0      # seconds
+# Pause after a Redis error before polling the queue again
+_ERROR_BACKOFF: float = 2.0    # seconds
+# Batches received longer ago than this are stale and not delivered
+_MAX_ALERT_AGE: float = 300.0  # seconds
+# How long stop() waits for an in-flight batch before cancelling it
+_STOP_TIMEOUT: float = 15.0    # seconds
+
+
+class SellAlertWorker:
+    """
+    Async worker consuming the sell-alert queue.
+
+    Parameters
+    ----------
+    handler:
+        Async callable invoked with each queued batch of sell trades.
+        Signature: ``async def handler(trades: list[EnrichedTrade]) -> None``
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[EnrichedTrade]], Awaitable[None]],
+    ) -> None:
+        self._handler = handler
+        self._account_id = settings.lighter_account_id
+        self._running = False
+        self._delivering = False
+        self._task: asyncio.Task | None = None
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def start(self) -> asyncio.Task:
+        """Spawn the background worker task and return it."""
+        self._running = True
+        self._task = asyncio.create_task(self._run(), name="sell_alert_worker")
+        return self._task
+
+    async def stop(self) -> None:
+        """
+        Gracefully stop the background task.
+
+        A batch that is being delivered gets up to _STOP_TIMEOUT seconds to
+        finish, so Pushover claims are not cut off half-way; an idle worker
+        (waiting on BRPOP) is cancelled straight away.
+        """
+        self._running = False
+        if self._task and not self._task.done():
+            if self._delivering:
+                done, _ = await asyncio.wait({self._task}, timeout=_STOP_TIMEOUT)
+                if done:
+                    return
+                logger.warning(
+                    "Sell alert still in flight after %.0fs – cancelling", _STOP_TIMEOUT
+                )
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    # ── Internal ──────────────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        while self._running:
+            try:
+                trades = await pop_sell_alert(self._account_id, timeout=_POP_TIMEOUT)
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.warning(
+                    "Sell-alert queue error: %s – retrying in %.1fs", exc, _ERROR_BACKOFF
+                )
+                await asyncio.sleep(_ERROR_BACKOFF)
+                continue
+
+            if not trades:
+                continue
+            age = time.time() - max(t.received_at for t in trades)
+            if age > _MAX_ALERT_AGE:
+                logger.warning(
+                    "Dropping stale sell alert (%d trade(s), received %.0fs ago)",
+                    len(trades),
+                    age,
+                )
+                continue
+
+            self._delivering = True
+            try:
+                await self._handler(trades)
+            except Exception as exc:
+                logger.exception("Sell-alert handler raised: %s", exc)
+            finally:
+                self._delivering = False
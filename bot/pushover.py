@@ -5,18 +5,23 @@ Spam-prevention
 ---------------
 Each user has a ``last_notification_at`` timestamp in SQLite.
 A notification is sent only if that timestamp is NULL or older than
-``SELL_NOTIFY_COOLDOWN_HOURS`` (default 2 h).
+``SELL_NOTIFY_COOLDOWN_HOURS`` (default 2 h).  Eligible users are claimed
+(timestamp stamped) before sending; the stamp is reset to NULL for users
+whose send failed.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
 
 import httpx
+from aiolimiter import AsyncLimiter
 
 from bot.config import settings
-from bot.database import get_all_users, update_last_notification
+from bot.database import claim_eligible_users, clear_last_notifications, get_all_users
+from bot.models import EnrichedTrade
 
 logger = logging.getLogger(__name__)
 
@@ -25,66 +30,165 @@ PUSHOVER_API_URL = "https://api.pushover.net/1/messages.json"
 # Cooldown in seconds
 _COOLDOWN_SECONDS: float = settings.sell_notify_cooldown_hours * 3600
 
+# Request fields that never change between alerts; only "message" and
+# "user" are filled in per send
+_BASE_DATA = {
+    "token": settings.pushover_user_key,  # app token
+    "title": "🐋 Lighter Whale SELL",
+    "priority": 0,
+}
 
-async def notify_sell(trade: dict) -> None:
+# Pushover rejects messages longer than 1024 characters; a combined alert
+# lists at most _MAX_SELL_LINES trades and is clamped to the limit.
+_MAX_MESSAGE_CHARS = 1024
+_MAX_SELL_LINES = 15
+
+# Shared client so TLS sessions are reused across sell alerts
+_client: httpx.AsyncClient | None = None
+
+# Caps in-flight requests so a large subscriber list cannot flood the pool
+_send_semaphore = asyncio.Semaphore(settings.pushover_concurrency)
+
+# Token bucket keeping us under Pushover's per-app rate instead of reacting
+# to 429 responses
+_rate_limiter = AsyncLimiter(25, 1.0)
+
+
+async def init_pushover() -> None:
+    """Create the shared HTTP client.  Called once from main.py."""
+    global _client
+    if _client is None:
+        # HTTP/2 multiplexes concurrent sends over one connection; the pool is
+        # sized to the send semaphore so HTTP/1.1 fallback never queues.
+        _client = httpx.AsyncClient(
+            timeout=10,
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=settings.pushover_concurrency,
+                max_connections=settings.pushover_concurrency,
+                keepalive_expiry=60,
+            ),
+        )
+
+
+async def close_pushover() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _send_one(client: httpx.AsyncClient, user: dict, data_template: dict) -> bool:
+    """Send one notification.  Returns True when Pushover accepted it."""
+    try:
+        async with _send_semaphore, _rate_limiter:
+            resp = await client.post(
+                PUSHOVER_API_URL,
+                data={**data_template, "user": user["pushover_key"]},
+            )
+    except httpx.RequestError as exc:
+        logger.error("Pushover HTTP request failed for user %d: %s", user["user_id"], exc)
+        return False
+
+    if resp.status_code != 200:
+        logger.warning(
+            "Pushover API error %d for user %d: %s",
+            resp.status_code,
+            user["user_id"],
+            resp.text,
+        )
+        return False
+    return True
+
+
+def _format_message(trades: list[EnrichedTrade]) -> str:
+    """Build the notification body for one or more sell trades."""
+    if len(trades) == 1:
+        trade = trades[0]
+        return (
+            f"Market: {trade.market}\n"
+            f"Price: {trade.price}\n"
+            f"Size: {trade.size}\n"
+            f"USD: ${trade.usd:,.2f}\n"
+            f"Account: {settings.lighter_account_id}"
+        )
+    lines = [
+        f"Market {t.market}: {t.size} @ {t.price} (${t.usd:,.2f})"
+        for t in trades[:_MAX_SELL_LINES]
+    ]
+    if len(trades) > _MAX_SELL_LINES:
+        lines.append(f"… and {len(trades) - _MAX_SELL_LINES} more")
+    lines.append(f"Total USD: ${sum(t.usd for t in trades):,.2f}")
+    lines.append(f"Account: {settings.lighter_account_id}")
+    message = "\n".join(lines)
+    if len(message) > _MAX_MESSAGE_CHARS:
+        message = message[: _MAX_MESSAGE_CHARS - 1] + "…"
+    return message
+
+
+async def notify_sell(trades: list[EnrichedTrade]) -> None:
     """
-    Notify all subscribed users about a sell trade, respecting the cooldown.
+    Notify all subscribed users about a batch of sell trades, respecting the
+    cooldown.  One notification is sent per batch.
+
+    Eligible users are notified concurrently over the shared client, with at
+    most ``PUSHOVER_CONCURRENCY`` requests in flight.
 
     Parameters
     ----------
-    trade:
-        The enriched trade dict from lighter_ws.py.
+    trades:
+        The enriched sell trades from one lighter_ws.py message.
     """
     users = await get_all_users()
     if not users:
         return
 
-    now = time.time()
-    market = trade.get("_market") or trade.get("market_id", "?")
-    price = trade.get("price", "?")
-    size = trade.get("size", "?")
-    usd = trade.get("_usd") or trade.get("usd_amount", "?")
-    msg_title = "🐋 Lighter Whale SELL"
-    msg_body = (
-        f"Market: {market}\n"
-        f"Price: {price}\n"
-        f"Size: {size}\n"
-        f"USD: ${float(usd):,.2f}\n"
-        f"Account: {settings.lighter_account_id}"
-    )
-
-    async with httpx.AsyncClient(timeout=10) as client:
-        for user in users:
-            last_notified: float | None = user["last_notification_at"]
-            if last_notified and (now - last_notified) < _COOLDOWN_SECONDS:
-                remaining = _COOLDOWN_SECONDS - (now - last_notified)
-                logger.debug(
-                    "Skipping Pushover for user %d – cooldown %.0fs remaining",
-                    user["user_id"],
-                    remaining,
-                )
-                continue
-
-            try:
-                resp = await client.post(
-                    PUSHOVER_API_URL,
-                    data={
-                        "token": settings.pushover_user_key,  # app token
-                        "user": user["pushover_key"],
-                        "title": msg_title,
-                        "message": msg_body,
-                        "priority": 0,
-                    },
-                )
-                if resp.status_code == 200:
-                    await update_last_notification(user["user_id"])
-                    logger.info("Pushover sent to user %d", user["user_id"])
-                else:
-                    logger.warning(
-                        "Pushover API error %d for user %d: %s",
-                        resp.status_code,
-                        user["user_id"],
-                        resp.text,
-                    )
-            except httpx.RequestError as exc:
-                logger.error("Pushover HTTP request failed for user %d: %s", user["user_id"], exc)
+    # Cheap pre-check against the cached rows so a sell with nobody out of
+    # cooldown never touches SQLite.
+    cutoff = time.time() - _COOLDOWN_SECONDS
+    if not any(
+        not u["last_notification_at"] or u["last_notification_at"] <= cutoff
+        for u in users
+    ):
+        logger.debug("Skipping Pushover – all %d user(s) still in cooldown", len(users))
+        return
+
+    # Claim (and stamp) the eligible users in one statement
+    eligible = await claim_eligible_users(_COOLDOWN_SECONDS)
+    skipped = len(users) - len(eligible)
+    if skipped:
+        logger.debug("Skipping Pushover for %d user(s) still in cooldown", skipped)
+    if not eligible:
+        return
+
+    data_template = {**_BASE_DATA, "message": _format_message(trades)}
+
+    if _client is None:
+        await init_pushover()
+    try:
+        results = await asyncio.gather(
+            *(_send_one(_client, user, data_template) for user in eligible),
+            return_exceptions=True,
+        )
+    except asyncio.CancelledError:
+        # Cancelled mid-send (e.g. shutdown) – release every claim rather
+        # than leave users in cooldown without having been notified.
+        await clear_last_notifications([u["user_id"] for u in eligible])
+        raise
+
+    sent_ids: list[int] = []
+    failed_ids: list[int] = []
+    for user, result in zip(eligible, results):
+        if isinstance(result, BaseException):
+            logger.error("Pushover send raised for user %d: %s", user["user_id"], result)
+            failed_ids.append(user["user_id"])
+        elif result:
+            sent_ids.append(user["user_id"])
+        else:
+            failed_ids.append(user["user_id"])
+
+    if sent_ids:
+        logger.info("Pushover sent to %d user(s): %s", len(sent_ids), sent_ids)
+    # Release the claim so failed users are retried on the next sell
+    if failed_ids:
+        await clear_last_notifications(failed_ids)
@@ -3,123 +3,322 @@ redis_client.py – async Redis helpers using Sorted Sets to store trades.
 
 Key schema
 ----------
-  trades:{account_id}   – Sorted Set; score = Unix timestamp (float);
-                          member = JSON-encoded trade dict.
+  trades:{account_id}              – Sorted Set; score = Unix timestamp (float);
+                                     member = ``trade_id``.
+  trade:{account_id}:{trade_id}    – Hash with the fields the report needs
+                                     (``side``, ``usd``, ``market``).
+  seen_sells:{account_id}:{trade_id} – String marker set (NX) when a sell is
+                                     dispatched; expires after
+                                     SEEN_SELL_TTL_SECONDS.
+  sell_alerts:{account_id}         – List used as a job queue; each item is a
+                                     JSON array of EnrichedTrade objects (one
+                                     WebSocket message worth of sells).
 
 TTL policy
 ----------
-  After every write the scheduler also calls `purge_old_trades()` which
-  removes members older than TRADE_RETENTION_SECONDS (360 s = 6 min).
+  The WebSocket ingest path writes through `store_and_purge()`, which adds the
+  new batch and removes members older than TRADE_RETENTION_SECONDS
+  (360 s = 6 min) in a single pipelined round-trip.  Per-trade hashes carry
+  an EXPIRE of the same length, so Redis drops them on its own.
+
+Report aggregation
+------------------
+  `get_trade_summary()` runs a Lua script that walks the sorted set and the
+  per-trade hashes server-side and returns only the per-market totals, so no
+  per-trade data crosses the network for the 5-minute report.  The script
+  touches keys it derives from the sorted-set members, which is fine on a
+  single Redis instance (not Redis Cluster).
 """
 
 from __future__ import annotations
 
-import json
 import logging
 import time
-from typing import Any
+from typing import NamedTuple
 
+import orjson
 import redis.asyncio as aioredis
 
 from bot.config import settings
+from bot.models import EnrichedTrade
 
 logger = logging.getLogger(__name__)
 
 # Trades older than this are removed from Redis (6 minutes)
 TRADE_RETENTION_SECONDS: int = 360
 
+# How long a dispatched sell is remembered for de-duplication (24 hours)
+SEEN_SELL_TTL_SECONDS: int = 86400
+
+# KEYS[1] = trades:{account}; ARGV[1] = min score; ARGV[2] = per-trade key prefix.
+# Returns {trade_count, total_buy, total_sell,
+#          market, buy_count, sell_count, buy_vol, sell_vol, …}.
+# Floats are returned via tostring() – Redis truncates Lua numbers to integers.
+_SUMMARY_LUA = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], '+inf')
+local stats, order = {}, {}
+local count, total_buy, total_sell = 0, 0, 0
+for _, id in ipairs(ids) do
+    local f = redis.call('HMGET', ARGV[2] .. id, 'side', 'usd', 'market')
+    local side, usd, market = f[1], tonumber(f[2]), f[3]
+    if market then
+        count = count + 1
+        local s = stats[market]
+        if not s then
+            s = {0, 0, 0, 0}
+            stats[market] = s
+            order[#order + 1] = market
+        end
+        usd = usd or 0
+        if side == 'buy' then
+            s[1] = s[1] + 1
+            s[3] = s[3] + usd
+            total_buy = total_buy + usd
+        elseif side == 'sell' then
+            s[2] = s[2] + 1
+            s[4] = s[4] + usd
+            total_sell = total_sell + usd
+        end
+    end
+end
+local out = {tostring(count), tostring(total_buy), tostring(total_sell)}
+for _, m in ipairs(order) do
+    local s = stats[m]
+    out[#out + 1] = m
+    out[#out + 1] = tostring(s[1])
+    out[#out + 1] = tostring(s[2])
+    out[#out + 1] = tostring(s[3])
+    out[#out + 1] = tostring(s[4])
+end
+return out
+"""
+
+# Indices into the per-market stats lists returned by get_trade_summary()
+BUY_COUNT, SELL_COUNT, BUY_VOL, SELL_VOL = range(4)
+
 _redis: aioredis.Redis | None = None
+_summary_script = None   # redis-py Script bound to _redis
+
+
+class TradeSummary(NamedTuple):
+    """Aggregated trade totals for a time window, as computed by Redis."""
+
+    trade_count: int
+    total_buy: float
+    total_sell: float
+    # market -> [buy_count, sell_count, buy_vol, sell_vol]
+    markets: dict[str, list]
 
 
 def _key(account_id: str) -> str:
     return f"trades:{account_id}"
 
 
-async def get_redis() -> aioredis.Redis:
-    """Return (and lazily create) the shared Redis connection pool."""
-    global _redis
+def _trade_prefix(account_id: str) -> str:
+    return f"trade:{account_id}:"
+
+
+def _seen_key(account_id: str, trade_id: int) -> str:
+    return f"seen_sells:{account_id}:{trade_id}"
+
+
+def _alerts_key(account_id: str) -> str:
+    return f"sell_alerts:{account_id}"
+
+
+def _create_redis() -> aioredis.Redis:
+    global _redis, _summary_script
+    _redis = aioredis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        password=settings.redis_password,
+        decode_responses=True,
+    )
+    # Falls back to SCRIPT LOAD automatically if Redis answers NOSCRIPT
+    _summary_script = _redis.register_script(_SUMMARY_LUA)
+    logger.info("Redis connection pool created (%s:%d)", settings.redis_host, settings.redis_port)
+    return _redis
+
+
+async def init_redis() -> None:
+    """
+    Create the shared Redis connection pool and load the Lua scripts.
+    Called once from main.py.
+    """
+    r = get_redis()
+    await r.script_load(_SUMMARY_LUA)
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the shared Redis connection pool created by ``init_redis()``."""
     if _redis is None:
-        _redis = aioredis.Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db,
-            password=settings.redis_password,
-            decode_responses=True,
-        )
-        logger.info("Redis connection pool created (%s:%d)", settings.redis_host, settings.redis_port)
+        # Unlikely path: only hit when a helper is used before init_redis()
+        return _create_redis()
     return _redis
 
 
 async def close_redis() -> None:
-    global _redis
+    global _redis, _summary_script
     if _redis is not None:
         await _redis.aclose()
         _redis = None
+        _summary_script = None
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Write helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-async def store_trades(account_id: str, trades: list[dict[str, Any]]) -> None:
+def _queue_store(pipe, account_id: str, trades: list[EnrichedTrade]) -> int:
+    """
+    Queue the ZADD + per-trade HSET/EXPIRE commands for a batch on ``pipe``.
+    Returns the number of distinct trades queued.
+    """
+    prefix = _trade_prefix(account_id)
+    scores: dict[str, float] = {}
+    for trade in trades:
+        # trade_id is the canonical unique identifier from the Lighter API
+        if trade.trade_id:
+            member = str(trade.trade_id)
+        else:
+            member = f"{trade.ts}:{trade.market}:{trade.price}:{trade.size}"
+        # ts is set by lighter_ws.py (seconds)
+        scores[member] = trade.ts
+        trade_key = prefix + member
+        pipe.hset(
+            trade_key,
+            mapping={
+                "side": trade.side,
+                "usd": trade.usd,
+                "market": trade.market,
+            },
+        )
+        pipe.expire(trade_key, TRADE_RETENTION_SECONDS)
+
+    pipe.zadd(_key(account_id), scores)
+    return len(scores)
+
+
+async def store_and_purge(
+    account_id: str,
+    trades: list[EnrichedTrade],
+    sells: list[EnrichedTrade] | None = None,
+) -> list[EnrichedTrade]:
     """
-    Persist a batch of trades into the sorted set.
+    Store a batch of trades and purge expired ones in a single round-trip.
 
-    Score  = ``_ts`` (Unix seconds, added by lighter_ws.py during enrichment).
-    Member = JSON-encoded enriched trade dict, keyed by ``trade_id`` for
-             deduplication.
+    Score  = ``ts`` (Unix seconds, set by lighter_ws.py during enrichment).
+    Member = ``trade_id``; re-receiving a trade only refreshes its score, so
+             deduplication happens server-side.  The report fields go into
+             ``trade:{account}:{id}``.  Members older than
+             TRADE_RETENTION_SECONDS are removed through the same pipeline.
 
-    The Lighter API provides:
-      - ``trade_id``  – unique integer ID for the trade
-      - ``timestamp`` – milliseconds epoch (converted to ``_ts`` in seconds
-                        by lighter_ws.py before this function is called)
+    ``sells`` (a subset of ``trades``) are additionally claimed in the
+    ``seen_sells`` keyspace; only the ones not claimed before are returned,
+    so alerts are not repeated when the feed re-sends trades (e.g. after a
+    reconnect).  Trades without a ``trade_id`` are always returned.
     """
     if not trades:
-        return
+        return []
 
-    r = await get_redis()
-    mapping: dict[str, float] = {}
-    for trade in trades:
-        # _ts is set by lighter_ws.py (seconds); fall back to now if missing
-        score = float(trade.get("_ts") or time.time())
-        # trade_id is the canonical unique identifier from the Lighter API
-        trade_id = trade.get("trade_id") or json.dumps(trade, sort_keys=True)
-        member = json.dumps({**trade, "_member_id": str(trade_id)}, sort_keys=True)
-        mapping[member] = score
+    sells = sells or []
+    claimable = [t for t in sells if t.trade_id]
+    r = get_redis()
+    key = _key(account_id)
+    cutoff = time.time() - TRADE_RETENTION_SECONDS
+    async with r.pipeline(transaction=False) as pipe:
+        stored = _queue_store(pipe, account_id, trades)
+        pipe.zremrangebyscore(key, "-inf", cutoff)
+        for sell in claimable:
+            pipe.set(
+                _seen_key(account_id, sell.trade_id),
+                1,
+                nx=True,
+                ex=SEEN_SELL_TTL_SECONDS,
+            )
+        results = await pipe.execute()
 
-    await r.zadd(_key(account_id), mapping)
-    logger.debug("Stored %d trades for account %s", len(mapping), account_id)
+    # Replies: store commands, ZREMRANGEBYSCORE, then one SET NX per claimable
+    n_claims = len(claimable)
+    removed = results[-n_claims - 1]
+    claimed = results[len(results) - n_claims:]
+    new_ids = {t.trade_id for t, ok in zip(claimable, claimed) if ok}
+    fresh = [t for t in sells if not t.trade_id or t.trade_id in new_ids]
 
+    logger.debug(
+        "Stored %d trades (purged %d, %d new sells) for account %s",
+        stored,
+        removed,
+        len(fresh),
+        account_id,
+    )
+    return fresh
 
-async def purge_old_trades(account_id: str) -> int:
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sell-alert queue
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def enqueue_sell_alert(account_id: str, trades: list[EnrichedTrade]) -> None:
+    """Push a batch of sell trades onto the alert queue (LPUSH)."""
+    if not trades:
+        return
+    r = get_redis()
+    # orjson serialises (slotted) dataclasses natively
+    await r.lpush(_alerts_key(account_id), orjson.dumps(trades))
+
+
+async def pop_sell_alert(
+    account_id: str,
+    timeout: float = 5.0,
+) -> list[EnrichedTrade] | None:
     """
-    Remove trades older than TRADE_RETENTION_SECONDS from the sorted set.
-    Returns the number of removed entries.
+    Block for up to ``timeout`` seconds for the oldest queued batch (BRPOP).
+    Returns None when the queue stayed empty.
     """
-    r = await get_redis()
-    cutoff = time.time() - TRADE_RETENTION_SECONDS
-    removed = await r.zremrangebyscore(_key(account_id), "-inf", cutoff)
-    if removed:
-        logger.debug("Purged %d old trades for account %s", removed, account_id)
-    return removed
+    r = get_redis()
+    item = await r.brpop([_alerts_key(account_id)], timeout=timeout)
+    if item is None:
+        return None
+    _key_name, payload = item
+    return [EnrichedTrade(**fields) for fields in orjson.loads(payload)]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Read helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-async def get_recent_trades(
+async def get_trade_summary(
     account_id: str,
     window_seconds: int | None = None,
-) -> list[dict[str, Any]]:
+) -> TradeSummary:
     """
-    Return trades within the last ``window_seconds`` seconds (default: full retention window).
-    Results are ordered by timestamp ascending.
+    Return buy/sell totals and the per-market breakdown for the last
+    ``window_seconds`` seconds (default: full retention window), aggregated
+    server-side by ``_SUMMARY_LUA``.
     """
     if window_seconds is None:
         window_seconds = TRADE_RETENTION_SECONDS
 
-    r = await get_redis()
+    get_redis()  # make sure _summary_script is bound
     min_score = time.time() - window_seconds
-    members = await r.zrangebyscore(_key(account_id), min_score, "+inf")
-    return [json.loads(m) for m in members]
+    reply = await _summary_script(
+        keys=[_key(account_id)],
+        args=[min_score, _trade_prefix(account_id)],
+    )
+
+    markets: dict[str, list] = {}
+    for i in range(3, len(reply), 5):
+        markets[reply[i]] = [
+            int(reply[i + 1]),
+            int(reply[i + 2]),
+            float(reply[i + 3]),
+            float(reply[i + 4]),
+        ]
+    return TradeSummary(
+        trade_count=int(reply[0]),
+        total_buy=float(reply[1]),
+        total_sell=float(reply[2]),
+        markets=markets,
+    )
@@ -6,20 +6,44 @@ to the Telegram channel.
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
+import time
 
+from aiolimiter import AsyncLimiter
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from bot.config import settings
-from bot.redis_client import get_recent_trades
+from bot.models import EnrichedTrade
+from bot.redis_client import BUY_COUNT, BUY_VOL, SELL_COUNT, SELL_VOL, get_trade_summary
 
 LIGHTALYTICS_BASE = "https://lightalytics.com/accounts"
 
+# Parts of the sell alert that depend only on configuration
+_ACCOUNT_LINK = (
+    f'<a href="{LIGHTALYTICS_BASE}/{settings.lighter_account_id}">'
+    f"Account {settings.lighter_account_id}</a>"
+)
+# Text around the market id in sell alerts; concatenated rather than used as
+# a format template, since the URL may contain braces
+if settings.binance_pair_url:
+    _MARKET_LINK_OPEN = f'Market: <a href="{settings.binance_pair_url}">'
+    _MARKET_LINK_CLOSE = "</a>"
+else:
+    _MARKET_LINK_OPEN = "Market: "
+    _MARKET_LINK_CLOSE = ""
+
 logger = logging.getLogger(__name__)
 
 _scheduler = AsyncIOScheduler()
 _bot_ref = None   # will be set by main.py
 
+# Max trades listed individually in a combined sell alert (Telegram caps a
+# message at 4096 characters)
+_MAX_SELL_LINES = 30
+
+# Telegram allows ~20 messages per minute to a single channel; shared by the
+# sell alerts and the periodic report.
+_channel_limiter = AsyncLimiter(19, 60)
+
 
 def set_bot(bot) -> None:
     """Inject the telegram.Bot instance from main.py."""
@@ -49,44 +73,52 @@ def stop_scheduler() -> None:
         _scheduler.shutdown(wait=False)
 
 
-async def send_sell_telegram(trade: dict) -> None:
-    """Send an instant sell-alert message to the Telegram channel."""
+async def send_sell_telegram(trades: list[EnrichedTrade]) -> None:
+    """
+    Send an instant sell-alert message to the Telegram channel.
+
+    All sells from one WebSocket message are combined into a single post to
+    stay within Telegram's per-channel rate limit.
+    """
     if _bot_ref is None:
         logger.warning("Bot reference not set – skipping Telegram sell alert")
         return
 
-    account_id = settings.lighter_account_id
-    market = trade.get("_market") or trade.get("market_id", "?")
-    price = trade.get("price", "?")
-    size = trade.get("size", "?")
-    usd = float(trade.get("_usd") or trade.get("usd_amount") or 0)
-
-    account_url = f"{LIGHTALYTICS_BASE}/{account_id}"
-    account_link = f'<a href="{account_url}">Account {account_id}</a>'
-
-    binance_url = settings.binance_pair_url
-    if binance_url:
-        market_line = f'Market: <a href="{binance_url}">{market}</a>'
+    if len(trades) == 1:
+        trade = trades[0]
+        message = (
+            f"🐋 <b>Lighter Whale SELL</b>\n\n"
+            f"{_MARKET_LINK_OPEN}{trade.market}{_MARKET_LINK_CLOSE}\n"
+            f"Price: {trade.price}\n"
+            f"Size: {trade.size}\n"
+            f"USD: ${trade.usd:,.2f}\n\n"
+            f"{_ACCOUNT_LINK}"
+        )
     else:
-        market_line = f"Market: {market}"
-
-    message = (
-        f"🐋 <b>Lighter Whale SELL</b>\n\n"
-        f"{market_line}\n"
-        f"Price: {price}\n"
-        f"Size: {size}\n"
-        f"USD: ${usd:,.2f}\n\n"
-        f"{account_link}"
-    )
+        lines = [f"🐋 <b>Lighter Whale SELL</b> ×{len(trades)}", ""]
+        for trade in trades[:_MAX_SELL_LINES]:
+            lines.append(
+                f"🔴 {_MARKET_LINK_OPEN}{trade.market}{_MARKET_LINK_CLOSE} – "
+                f"{trade.size} @ {trade.price} (${trade.usd:,.2f})"
+            )
+        if len(trades) > _MAX_SELL_LINES:
+            lines.append(f"… and {len(trades) - _MAX_SELL_LINES} more")
+        lines.append("")
+        lines.append(f"Total USD: ${sum(t.usd for t in trades):,.2f}")
+        lines.append("")
+        lines.append(_ACCOUNT_LINK)
+        message = "\n".join(lines)
 
+    markets = ", ".join(sorted({t.market for t in trades}))
     try:
-        await _bot_ref.send_message(
-            chat_id=settings.telegram_channel_id,
-            text=message,
-            parse_mode="HTML",
-            disable_web_page_preview=True,
-        )
-        logger.info("Telegram sell alert posted for market %s", market)
+        async with _channel_limiter:
+            await _bot_ref.send_message(
+                chat_id=settings.telegram_channel_id,
+                text=message,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        logger.info("Telegram sell alert posted for market(s) %s", markets)
     except Exception as exc:
         logger.error("Failed to post Telegram sell alert: %s", exc)
 
@@ -96,54 +128,36 @@ async def send_sell_telegram(trade: dict) -> None:
 # ─────────────────────────────────────────────────────────────────────────────
 
 async def _post_trade_report() -> None:
-    """Fetch recent trades from Redis, summarise, and post to Telegram."""
+    """Summarise recent trades in Redis and post the report to Telegram."""
     if _bot_ref is None:
         logger.warning("Bot reference not set – skipping report")
         return
 
     account_id = settings.lighter_account_id
-    window = settings.report_interval_minutes * 60  # seconds
+    interval = settings.report_interval_minutes
+    window = interval * 60  # seconds
 
     try:
-        trades = await get_recent_trades(account_id, window_seconds=window)
+        summary = await get_trade_summary(account_id, window_seconds=window)
     except Exception as exc:
         logger.error("Failed to fetch trades from Redis: %s", exc)
         return
 
-    if not trades:
-        logger.debug("No trades in the last %d minutes – skipping report", settings.report_interval_minutes)
+    if not summary.trade_count:
+        logger.debug("No trades in the last %d minutes – skipping report", interval)
         return
 
-    # Aggregate per market
-    # Trades are enriched by lighter_ws.py with normalised helpers:
-    #   _side   : "buy" | "sell" | "unknown"
-    #   _usd    : float  – usd_amount from the API (pre-calculated)
-    #   _market : str    – market_id as a string
-    market_stats: dict[str, dict] = {}
-    total_buy_volume = 0.0
-    total_sell_volume = 0.0
-
-    for trade in trades:
-        mkt = trade.get("_market") or str(trade.get("market_id", "unknown"))
-        stats = market_stats.setdefault(mkt, {"buy_count": 0, "sell_count": 0, "buy_vol": 0.0, "sell_vol": 0.0})
-
-        usd = float(trade.get("_usd") or trade.get("usd_amount") or 0)
-
-        side = trade.get("_side", "unknown")
-        if side == "buy":
-            stats["buy_count"] += 1
-            stats["buy_vol"] += usd
-            total_buy_volume += usd
-        elif side == "sell":
-            stats["sell_count"] += 1
-            stats["sell_vol"] += usd
-            total_sell_volume += usd
-
-    now_utc = datetime.now(timezone.utc).strftime("%H:%M UTC")
+    # Totals and per-market stats are aggregated inside Redis (Lua) from the
+    # side / usd / market fields stored by redis_client.store_and_purge().
+    total_buy_volume = summary.total_buy
+    total_sell_volume = summary.total_sell
+    market_stats = summary.markets
+
+    now_utc = time.strftime("%H:%M UTC", time.gmtime())
     lines = [
         f"🐋 <b>Lighter Whale Report</b>  <i>{now_utc}</i>",
         f"Account: <code>{account_id}</code>",
-        f"Window: last {settings.report_interval_minutes} min",
+        f"Window: last {interval} min",
         "",
         f"📈 <b>Total BUY  volume:</b>  ${total_buy_volume:,.2f}",
         f"📉 <b>Total SELL volume:</b>  ${total_sell_volume:,.2f}",
@@ -155,18 +169,19 @@ async def _post_trade_report() -> None:
         for mkt, s in sorted(market_stats.items()):
             lines.append(
                 f"  Market {mkt}: "
-                f"↑{s['buy_count']} (${s['buy_vol']:,.2f})  "
-                f"↓{s['sell_count']} (${s['sell_vol']:,.2f})"
+                f"↑{s[BUY_COUNT]} (${s[BUY_VOL]:,.2f})  "
+                f"↓{s[SELL_COUNT]} (${s[SELL_VOL]:,.2f})"
             )
 
     message = "\n".join(lines)
 
     try:
-        await _bot_ref.send_message(
-            chat_id=settings.telegram_channel_id,
-            text=message,
-            parse_mode="HTML",
-        )
+        async with _channel_limiter:
+            await _bot_ref.send_message(
+                chat_id=settings.telegram_channel_id,
+                text=message,
+                parse_mode="HTML",
+            )
         logger.info("Trade report posted to Telegram channel")
     except Exception as exc:
         logger.error("Failed to post trade report: %s", exc)